@@ -1,15 +1,69 @@
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Tuple
+import sys
+from dataclasses import dataclass, field
+from enum import IntEnum
+from types import MappingProxyType
+from typing import Callable, List, Optional, Mapping, Sequence, Tuple
 
-@dataclass
+__all__ = ["InvoiceService", "Invoice", "LineItem", "Country", "Membership"]
+
+def _ship_th(subtotal: float) -> float:
+    return 60 if subtotal < 500 else 0
+
+def _ship_jp(subtotal: float) -> float:
+    return 600 if subtotal < 4000 else 0
+
+def _ship_us(subtotal: float) -> float:
+    if subtotal < 100: return 15
+    return 8 if subtotal < 300 else 0
+
+def _ship_default(subtotal: float) -> float:
+    return 25 if subtotal < 200 else 0
+
+class Country(IntEnum):
+    TH = 0
+    JP = 1
+    US = 2
+    OTHER = 3
+
+class Membership(IntEnum):
+    GOLD = 0
+    PLATINUM = 1
+    OTHER = 2
+
+_COUNTRY_LOOKUP: Mapping[str, Country] = MappingProxyType({
+    "TH": Country.TH,
+    "JP": Country.JP,
+    "US": Country.US,
+})
+
+_MEMBERSHIP_LOOKUP: Mapping[str, Membership] = MappingProxyType({
+    "gold": Membership.GOLD,
+    "platinum": Membership.PLATINUM,
+})
+
+# The tables below are indexed by Country / Membership value.
+_SHIPPING_TABLE: Tuple[Callable[[float], float], ...] = (_ship_th, _ship_jp, _ship_us, _ship_default)
+_TAX_TABLE: Tuple[float, ...] = (0.07, 0.10, 0.08, 0.05)
+_MEMBERSHIP_RATE_TABLE: Tuple[Optional[float], ...] = (0.03, 0.05, None)
+
+_FRAGILE_FEE_PER_UNIT = 5.0
+
+@dataclass(slots=True, frozen=True)
 class LineItem:
     sku: str
     category: str
     unit_price: float
     qty: int
     fragile: bool = False
+    # Derived once at construction so the cost loop only has to add them up.
+    line_total: float = field(init=False, repr=False, compare=False)
+    fragile_fee: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "line_total", self.unit_price * self.qty)
+        object.__setattr__(self, "fragile_fee", _FRAGILE_FEE_PER_UNIT * self.qty if self.fragile else 0.0)
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Invoice:
     invoice_id: str
     customer_id: str
@@ -17,14 +71,24 @@ class Invoice:
     membership: str
     coupon: Optional[str]
     items: List[LineItem]
+    # Resolved once at construction; the invoice is frozen so these cannot go stale.
+    country_id: Country = field(init=False, repr=False, compare=False)
+    membership_id: Membership = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Blank coupons become None so the hot path only needs a truthiness check.
+        coupon = self.coupon.strip() if self.coupon else None
+        object.__setattr__(self, "coupon", sys.intern(coupon) if coupon else None)
+        object.__setattr__(self, "country_id", _COUNTRY_LOOKUP.get(self.country, Country.OTHER))
+        object.__setattr__(self, "membership_id", _MEMBERSHIP_LOOKUP.get(self.membership, Membership.OTHER))
 
 class InvoiceService:
-    def __init__(self) -> None:
-        self._coupon_rate: Dict[str, float] = {
-            "WELCOME10": 0.10,
-            "VIP20": 0.20,
-            "STUDENT5": 0.05
-        }
+    _CATEGORIES = frozenset({"book", "food", "electronics", "other"})
+    _COUPON_RATE: Mapping[str, float] = MappingProxyType({
+        "WELCOME10": 0.10,
+        "VIP20": 0.20,
+        "STUDENT5": 0.05
+    })
 
     def _validate(self, inv: Invoice) -> List[str]:
         problems: List[str] = []
@@ -37,6 +101,7 @@ class InvoiceService:
             problems.append("Missing customer_id")
         if not inv.items:
             problems.append("Invoice must contain items")
+        # Item rules must stay in step with the inline check in _calculate_base_costs.
         for it in inv.items:
             if not it.sku:
                 problems.append("Item sku is missing")
@@ -44,60 +109,71 @@ class InvoiceService:
                 problems.append(f"Invalid qty for {it.sku}")
             if it.unit_price < 0:
                 problems.append(f"Invalid price for {it.sku}")
-            if it.category not in ("book", "food", "electronics", "other"):
+            if it.category not in self._CATEGORIES:
                 problems.append(f"Unknown category for {it.sku}")
         return problems
 
-    def compute_total(self, inv: Invoice) -> Tuple[float, List[str]]:
-        problems = self._validate(inv)
-        if problems:
-            raise ValueError("; ".join(problems))
+    def compute_total(self, inv: Invoice) -> Tuple[float, List[str], List[str]]:
+        # Returns (total, warnings, problems); an invalid invoice yields (0.0, [], problems).
+        base_costs = None
+        if inv is not None and inv.invoice_id and inv.customer_id and inv.items:
+            base_costs = self._calculate_base_costs(inv.items)
+        if base_costs is None:
+            # Slow path: only build the descriptive messages once we know the invoice is bad.
+            problems = self._validate(inv)
+            assert problems, "_calculate_base_costs rejected an item that _validate accepts"
+            return 0.0, [], problems
 
-        subtotal, fragile_fee = self._calculate_base_costs(inv.items)
+        subtotal, fragile_fee = base_costs
         discount, warnings = self._calculate_discount(inv, subtotal)
-        shipping = self._calculate_shipping(inv.country, subtotal)
-        tax = self._calculate_tax(inv.country, subtotal - discount)
+        shipping = self._calculate_shipping(inv.country_id, subtotal)
+        tax = self._calculate_tax(inv.country_id, subtotal - discount)
 
         total = max(0.0, subtotal + shipping + fragile_fee + tax - discount)
 
-        if subtotal > 10000 and inv.membership not in ("gold", "platinum"):
+        if subtotal > 10000 and inv.membership_id == Membership.OTHER:
             warnings.append("Consider membership upgrade")
 
+        return total, warnings, []
+
+    def compute_total_or_raise(self, inv: Invoice) -> Tuple[float, List[str]]:
+        total, warnings, problems = self.compute_total(inv)
+        if problems:
+            raise ValueError("; ".join(problems))
         return total, warnings
 
-    def _calculate_base_costs(self, items: List[LineItem]) -> Tuple[float, float]:
-        subtotal = sum(it.unit_price * it.qty for it in items)
-        fragile_fee = sum(5.0 * it.qty for it in items if it.fragile)
+    def compute_totals(self, invoices: Sequence[Invoice]) -> List[Tuple[float, List[str], List[str]]]:
+        # Convenience wrapper over compute_total; one (total, warnings, problems) per invoice, in input order.
+        return [self.compute_total(inv) for inv in invoices]
+
+    def _calculate_base_costs(self, items: List[LineItem]) -> Optional[Tuple[float, float]]:
+        # Validates items in the same pass; returns None if any item is invalid.
+        categories = self._CATEGORIES
+        subtotal = 0.0
+        fragile_fee = 0.0
+        for it in items:
+            # Same comparisons as the item rules in _validate; kept inline to avoid a call per item.
+            if not it.sku or it.qty <= 0 or it.unit_price < 0 or it.category not in categories:
+                return None
+            subtotal += it.line_total
+            fragile_fee += it.fragile_fee
         return subtotal, fragile_fee
 
-    def _calculate_shipping(self, country: str, subtotal: float) -> float:
-        rates = {
-            "TH": (500, 60),
-            "JP": (4000, 600),
-            "US": (0, 0),
-            "DEFAULT": (200, 25)
-        }
-        
-        if country == "US":
-            if subtotal < 100: return 15
-            return 8 if subtotal < 300 else 0
-            
-        threshold, fee = rates.get(country, rates["DEFAULT"])
-        return fee if subtotal < threshold else 0
+    def _calculate_shipping(self, country_id: Country, subtotal: float) -> float:
+        return _SHIPPING_TABLE[country_id](subtotal)
 
     def _calculate_discount(self, inv: Invoice, subtotal: float) -> Tuple[float, List[str]]:
         discount = 0.0
         warnings = []
 
-        tier_rates = {"gold": 0.03, "platinum": 0.05}
-        if inv.membership in tier_rates:
-            discount += subtotal * tier_rates[inv.membership]
+        tier_rate = _MEMBERSHIP_RATE_TABLE[inv.membership_id]
+        if tier_rate is not None:
+            discount += subtotal * tier_rate
         elif subtotal > 3000:
             discount += 20
 
-        if inv.coupon and inv.coupon.strip():
-            code = inv.coupon.strip()
-            rate = self._coupon_rate.get(code)
+        if inv.coupon:
+            rate = self._COUPON_RATE.get(inv.coupon)
             if rate is not None:
                 discount += subtotal * rate
             else:
@@ -105,7 +181,5 @@ class InvoiceService:
                 
         return discount, warnings
 
-    def _calculate_tax(self, country: str, taxable_amount: float) -> float:
-        tax_rates = {"TH": 0.07, "JP": 0.10, "US": 0.08}
-        rate = tax_rates.get(country, 0.05)
-        return taxable_amount * rate
\ No newline at end of file
+    def _calculate_tax(self, country_id: Country, taxable_amount: float) -> float:
+        return taxable_amount * _TAX_TABLE[country_id]
\ No newline at end of file
@@ -1,5 +1,6 @@
+import dataclasses
 import unittest
-from src.invoice_service import InvoiceService, Invoice, LineItem
+from src.invoice_service import InvoiceService, Invoice, LineItem, Country, Membership
 
 class TestInvoiceService(unittest.TestCase):
     def setUp(self):
@@ -9,19 +10,125 @@ class TestInvoiceService(unittest.TestCase):
     def test_shipping_logic(self):
         # Test US Shipping tiers
         inv_us_low = Invoice("1", "C1", "US", "none", None, [self.item]) # Subtotal 100
-        total, _ = self.service.compute_total(inv_us_low)
+        total, _, _ = self.service.compute_total(inv_us_low)
         # Expected: 100 (sub) + 15 (ship) + 8 (tax on 100) = 123.0
         
     def test_coupon_and_membership(self):
         # Test Gold membership + VIP20 coupon
         gold_item = LineItem("SKU1", "book", 1000.0, 1)
         inv = Invoice("2", "C2", "TH", "gold", "VIP20", [gold_item])
-        total, warnings = self.service.compute_total(inv)
+        total, warnings, _ = self.service.compute_total(inv)
         # Should apply both 3% and 20% discounts
         self.assertIn("VIP20", inv.coupon)
 
     def test_validation_errors(self):
         # Test that the complexity reduction didn't break error handling
         bad_inv = Invoice("3", "C3", "TH", "none", None, [])
+        total, warnings, problems = self.service.compute_total(bad_inv)
+        self.assertEqual((total, warnings), (0.0, []))
+        self.assertEqual(problems, ["Invoice must contain items"])
         with self.assertRaises(ValueError):
-            self.service.compute_total(bad_inv)
\ No newline at end of file
+            self.service.compute_total_or_raise(bad_inv)
+
+    def test_invalid_item_reports_all_problems(self):
+        bad_item = LineItem("SKU2", "toys", 10.0, 0)
+        inv = Invoice("4", "C4", "TH", "none", None, [self.item, bad_item])
+        with self.assertRaises(ValueError) as ctx:
+            self.service.compute_total_or_raise(inv)
+        self.assertIn("Invalid qty for SKU2", str(ctx.exception))
+        self.assertIn("Unknown category for SKU2", str(ctx.exception))
+
+    def test_fast_path_and_validate_agree_on_items(self):
+        items = [
+            LineItem("", "book", 1.0, 1),
+            LineItem("A", "book", 1.0, 0),
+            LineItem("A", "book", -0.01, 1),
+            LineItem("A", "book", 0.0, 1),
+            LineItem("A", "book", float("nan"), 1),
+            LineItem("A", "toys", 1.0, 1),
+        ]
+        for it in items:
+            inv = Invoice("4b", "C4", "TH", "none", None, [it])
+            rejected = self.service._calculate_base_costs([it]) is None
+            self.assertEqual(rejected, bool(self.service._validate(inv)), it)
+
+    def test_line_item_precomputes_costs(self):
+        item = LineItem("SKU3", "electronics", 25.0, 4, fragile=True)
+        self.assertEqual(item.line_total, 100.0)
+        self.assertEqual(item.fragile_fee, 20.0)
+        self.assertEqual(self.item.fragile_fee, 0.0)
+
+    def test_shipping_by_country(self):
+        cases = [("TH", 60), ("JP", 600), ("US", 8), ("SG", 25)]
+        for country, fee in cases:
+            inv = Invoice("5", "C5", country, "none", None, [self.item])
+            total, _, _ = self.service.compute_total(inv)
+            tax = 100.0 * {"TH": 0.07, "JP": 0.10, "US": 0.08, "SG": 0.05}[country]
+            self.assertAlmostEqual(total, 100.0 + fee + tax)
+
+    def test_compute_totals_batch(self):
+        invoices = [
+            Invoice("6", "C6", "TH", "gold", "VIP20", [self.item]),
+            Invoice("7", "C7", "US", "none", None, [self.item, LineItem("SKU4", "food", 50.0, 3, True)]),
+            Invoice("7b", "C7", "TH", "none", None, []),
+        ]
+        results = self.service.compute_totals(invoices)
+        self.assertEqual(len(results), 3)
+        # 100 - (3 + 20) discount, 60 TH shipping, 7% tax on 77
+        self.assertAlmostEqual(results[0][0], 142.39)
+        self.assertEqual(results[0][2], [])
+        # 250 subtotal, 8 US shipping, 15 fragile fee, 8% tax on 250
+        self.assertAlmostEqual(results[1][0], 293.0)
+        self.assertEqual(results[1][2], [])
+        # An invalid invoice does not abort the batch and keeps its problems.
+        self.assertEqual(results[2], (0.0, [], ["Invoice must contain items"]))
+
+    def test_invoice_resolves_country_and_membership(self):
+        inv = Invoice("8", "C8", "JP", "platinum", None, [self.item])
+        self.assertIs(inv.country_id, Country.JP)
+        self.assertIs(inv.membership_id, Membership.PLATINUM)
+        other = Invoice("9", "C9", "FR", "none", None, [self.item])
+        self.assertIs(other.country_id, Country.OTHER)
+        self.assertIs(other.membership_id, Membership.OTHER)
+
+    def test_invoice_pricing_fields_are_frozen(self):
+        inv = Invoice("16", "C16", "TH", "none", None, [self.item])
+        for name, value in (("country", "US"), ("membership", "gold")):
+            with self.assertRaises(dataclasses.FrozenInstanceError):
+                setattr(inv, name, value)
+        self.assertIs(inv.country_id, Country.TH)
+        self.assertAlmostEqual(self.service.compute_total(inv)[0], 167.0)
+        # dataclasses.replace re-runs __post_init__, so the ids follow the new values.
+        self.assertAlmostEqual(self.service.compute_total(dataclasses.replace(inv, country="US"))[0], 116.0)
+
+    def test_coupon_normalized_at_ingestion(self):
+        inv = Invoice("10", "C10", "TH", "none", "  WELCOME10 ", [self.item])
+        self.assertEqual(inv.coupon, "WELCOME10")
+        _, warnings, _ = self.service.compute_total(inv)
+        self.assertNotIn("Unknown coupon", warnings)
+        self.assertIsNone(Invoice("11", "C11", "TH", "none", "   ", [self.item]).coupon)
+
+    def test_coupon_normalized_on_replace_and_not_reassignable(self):
+        inv = Invoice("17", "C17", "TH", "none", None, [self.item])
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            inv.coupon = " VIP20 "
+        total, warnings, _ = self.service.compute_total(dataclasses.replace(inv, coupon=" VIP20 "))
+        self.assertEqual(warnings, [])
+        # 100 - 20 VIP20 discount, 60 TH shipping, 7% tax on 80
+        self.assertAlmostEqual(total, 145.6)
+
+    def test_membership_and_coupon_pricing(self):
+        gold = Invoice("12", "C12", "TH", "gold", "VIP20", [LineItem("SKU1", "book", 1000.0, 1)])
+        # 1000 - (30 + 200) discount, free TH shipping, 7% tax on 770
+        self.assertAlmostEqual(self.service.compute_total(gold)[0], 823.9)
+        flat = Invoice("13", "C13", "JP", "none", None, [LineItem("SKU1", "book", 4000.0, 1)])
+        # flat 20 discount for non-members over 3000, free JP shipping at 4000, 10% tax on 3980
+        self.assertAlmostEqual(self.service.compute_total(flat)[0], 4378.0)
+
+    def test_str_subclass_category_is_accepted(self):
+        class Cat(str):
+            pass
+        inv = Invoice("14", "C14", "TH", "none", None, [LineItem("SKU5", Cat("book"), 1.0, 1)])
+        total, _, problems = self.service.compute_total(inv)
+        self.assertEqual(problems, [])
+        self.assertAlmostEqual(total, 61.07)